@@ -1,4 +1,4 @@
-from backend.clients.mysql_client import MySQLClient
+from backend.clients.mysql_client import MySQLClient, TransactionAborted
 from backend.clients.sheets_client import SheetsClient
 
-__all__ = ["MySQLClient", "SheetsClient"]
\ No newline at end of file
+__all__ = ["MySQLClient", "SheetsClient", "TransactionAborted"]
\ No newline at end of file
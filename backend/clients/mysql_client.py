@@ -1,8 +1,12 @@
+import asyncio
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import MetaData, Table, bindparam, create_engine, insert, text
+from sqlalchemy.engine import Connection, Engine
 from dotenv import load_dotenv
 
 from backend.utils import logger
@@ -10,6 +14,29 @@ from backend.utils import logger
 # Load environment variables
 load_dotenv()
 
+# Max rows per INSERT batch; keeps each statement well under max_allowed_packet
+INSERT_BATCH_SIZE = 10_000
+
+# Max rows folded into one CASE-based UPDATE / one DELETE ... IN (...)
+UPDATE_BATCH_SIZE = 1_000
+DELETE_BATCH_SIZE = 10_000
+
+# Max primary keys per SELECT ... WHERE pk IN (...) when fetching changed rows
+SELECT_BATCH_SIZE = 10_000
+
+# Rows per DataFrame chunk when streaming the table out of MySQL
+FETCH_CHUNK_SIZE = 50_000
+
+# Seconds before the cached column schema is queried again
+SCHEMA_CACHE_TTL = 60
+
+def _quote(identifier: str) -> str:
+    """Backtick-quote a MySQL identifier so reserved words and odd names are safe."""
+    return "`" + identifier.replace("`", "``") + "`"
+
+class TransactionAborted(RuntimeError):
+    """The server rolled back a whole transaction() block (e.g. on deadlock); none of its writes were kept."""
+
 class MySQLClient:
     """Handles all MySQL database operations."""
     
@@ -37,7 +64,44 @@ class MySQLClient:
         
         connection_string = f"mysql+pymysql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
         
-        self.engine = create_engine(connection_string)
+        # Pre-ping and recycle so connections dropped by wait_timeout are replaced transparently
+        self.engine = create_engine(
+            connection_string,
+            pool_size=int(os.getenv('MYSQL_POOL_SIZE', 10)),
+            max_overflow=int(os.getenv('MYSQL_MAX_OVERFLOW', 20)),
+            pool_recycle=int(os.getenv('MYSQL_POOL_RECYCLE', 3600)),
+            pool_timeout=30,
+            pool_pre_ping=True
+        )
+        
+        # Reflected lazily on first use by Core statements
+        self._table: Optional[Table] = None
+        
+        # Column schema cache: (schema, fetched_at)
+        self._schema_cache: Optional[tuple] = None
+        
+        # Connection of the transaction() block open on each thread, if any
+        self._local = threading.local()
+        
+        # Identifiers never change, so quote them and build the fixed statements once
+        self._table_sql = _quote(self.table)
+        self._pk_sql = _quote(self.primary_key)
+        self._select_all_sql = text(f"SELECT * FROM {self._table_sql}")
+        self._clear_sql = text(f"DELETE FROM {self._table_sql}")
+        self._delete_sql = text(f"DELETE FROM {self._table_sql} WHERE {self._pk_sql} = :pk_value")
+        self._delete_many_sql = text(
+            f"DELETE FROM {self._table_sql} WHERE {self._pk_sql} IN :pk_values"
+        ).bindparams(bindparam('pk_values', expanding=True))
+        self._select_many_sql = text(
+            f"SELECT * FROM {self._table_sql} WHERE {self._pk_sql} IN :pk_values"
+        ).bindparams(bindparam('pk_values', expanding=True))
+        self._schema_sql = text("""
+            SELECT COLUMN_NAME, DATA_TYPE 
+            FROM INFORMATION_SCHEMA.COLUMNS 
+            WHERE TABLE_SCHEMA = :database 
+            AND TABLE_NAME = :table
+            ORDER BY ORDINAL_POSITION
+        """)
         
         # TODO: Test connection
         self._test_connection()
@@ -55,32 +119,169 @@ class MySQLClient:
             logger.error("mysql_connection_failed", error=str(e), host=self.host)
             raise
     
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """
+        Run every write in the block on one pooled connection and commit once at the end.
+        Write methods called inside it join the transaction under a savepoint, so a
+        failed call is rolled back on its own and doesn't undo the others. If the
+        savepoint can't be rolled back or released, the server has already discarded
+        the whole transaction and TransactionAborted is raised instead.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            savepoint = conn.begin_nested()
+            try:
+                yield conn
+            except Exception:
+                self._end_savepoint(savepoint.rollback)
+                raise
+            self._end_savepoint(savepoint.commit)
+            return
+        
+        with self.engine.begin() as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    def _end_savepoint(self, end) -> None:
+        """Roll back or release a savepoint, raising TransactionAborted if the transaction is gone."""
+        try:
+            end()
+        except Exception as e:
+            logger.error("mysql_transaction_aborted", error=str(e), table=self.table)
+            raise TransactionAborted(str(e)) from e
+
+    def _get_table(self) -> Table:
+        """Reflect the synced table once and reuse it for Core statements."""
+        if self._table is None:
+            self._table = Table(self.table, MetaData(), autoload_with=self.engine)
+        return self._table
+
+    def iter_all_data(self, chunksize: int = FETCH_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Stream the table as DataFrame chunks.
+        Uses a server-side cursor (PyMySQL SSCursor via stream_results), so only
+        one chunk is held client-side at a time. Columns are Arrow-backed: strings
+        live in contiguous buffers and integer columns with NULLs stay integers.
+        """
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            yield from pd.read_sql(self._select_all_sql, conn, chunksize=chunksize, dtype_backend='pyarrow')
+
     def get_all_data(self)->pd.DataFrame:
         """Fetch all data from the table as a DataFrame."""
         try: 
-            query= f"SELECT * FROM {self.table}"
-            df= pd.read_sql(query,self.engine)
+            # Concatenate the streamed chunks into one frame
+            df = pd.concat(self.iter_all_data(), ignore_index=True, copy=False)
             logger.info("mysql_data_fetched",rows=len(df), table=self.table)
             return df
         except Exception as e: 
             logger.error("mysql_fetch_failed", error=str(e), table=self.table)
             raise
 
+    async def async_get_all_data(self) -> pd.DataFrame:
+        """Fetch all data from an async context; the blocking call runs in a worker thread."""
+        return await asyncio.to_thread(self.get_all_data)
+
+    def get_row_hashes(self) -> pd.Series:
+        """
+        Fetch a 64-bit digest of every row, computed by MySQL.
+        Transfers one key and one integer per row; comparing against the previous
+        call shows which rows need fetching.
+        
+        Returns:
+            uint64 Series indexed by string primary key
+        """
+        try:
+            # NULLs hash like empty strings, matching how ChangeDetector compares cells
+            cells = ", ".join(f"COALESCE({_quote(column)}, '')" for column in self.get_schema())
+            digest = f"CAST(CONV(LEFT(MD5(CONCAT_WS(CHAR(31), {cells})), 16), 16, 10) AS UNSIGNED)"
+            query = text(f"SELECT {self._pk_sql}, {digest} FROM {self._table_sql}")
+            
+            with self.engine.connect() as conn:
+                rows = conn.execute(query).all()
+            
+            hashes = pd.Series([row[1] for row in rows], dtype='uint64',
+                               index=pd.Index([str(row[0]) for row in rows], dtype=object))
+            logger.info("mysql_row_hashes_fetched", rows=len(hashes), table=self.table)
+            return hashes
+        except Exception as e:
+            logger.error("mysql_row_hashes_failed", error=str(e), table=self.table)
+            raise
+
+    def get_rows_by_pk(self, pk_values: List[Any]) -> pd.DataFrame:
+        """Fetch only the given rows, with the same Arrow-backed columns as get_all_data."""
+        try:
+            with self.engine.connect() as conn:
+                chunks = [
+                    pd.read_sql(self._select_many_sql, conn, dtype_backend='pyarrow',
+                                params={'pk_values': list(pk_values[start:start + SELECT_BATCH_SIZE])})
+                    for start in range(0, len(pk_values), SELECT_BATCH_SIZE)
+                ]
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+            logger.info("mysql_rows_fetched", rows=len(df), requested=len(pk_values), table=self.table)
+            return df
+        except Exception as e:
+            logger.error("mysql_fetch_failed", error=str(e), table=self.table)
+            raise
+
     def insert_row(self,data:Dict[str,Any])->int:
         """Insert a row into the table """
+        return self.insert_rows([data])[0]
+
+    def insert_rows(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Insert many rows in a single transaction.
+        Rows with the same columns are sent together through executemany, which
+        PyMySQL rewrites into multi-row INSERT ... VALUES statements. Backends that
+        support INSERT ... RETURNING (e.g. MariaDB 10.5+) return every generated key
+        from the same round trip.
+        
+        Returns:
+            Primary key of each row in input order. Without RETURNING (MySQL), rows
+            lacking an explicit key only get their AUTO_INCREMENT id back when
+            inserted on their own.
+        """
+        if not rows:
+            return []
+        
         try:
-            columns=','.join(data.keys())
-            placeholders=','.join([f":{key}" for key in data.keys()]) # ts is to prevent SQL Injection so think of it as a way to no explicitly pass values as code
-            query = f"INSERT INTO {self.table}({columns}) VALUES({placeholders})"
+            ids: List[Any] = [row.get(self.primary_key) for row in rows]
             
-            with self.engine.begin() as conn:
-                result=conn.execute(text(query),data)
-                new_id=result.lastrowid
-
-            logger.info("mysql_row_inserted",table=self.table, id=new_id)
-            return new_id
+            # Group row positions by column set so each group shares one statement
+            groups: Dict[tuple, List[int]] = {}
+            for position, row in enumerate(rows):
+                groups.setdefault(tuple(row.keys()), []).append(position)
+            
+            table = self._get_table()
+            statement = insert(table)
+            
+            # MySQL itself has no INSERT ... RETURNING, so fall back to lastrowid there
+            returning = self.engine.dialect.insert_executemany_returning
+            if returning:
+                statement = statement.returning(table.c[self.primary_key], sort_by_parameter_order=True)
+            
+            with self.transaction() as conn:
+                for positions in groups.values():
+                    for start in range(0, len(positions), INSERT_BATCH_SIZE):
+                        chunk = positions[start:start + INSERT_BATCH_SIZE]
+                        params = [rows[position] for position in chunk]
+                        
+                        if returning:
+                            new_ids = conn.execute(statement, params).scalars().all()
+                            for position, new_id in zip(chunk, new_ids):
+                                ids[position] = new_id
+                        elif len(chunk) == 1:
+                            ids[chunk[0]] = conn.execute(statement, params[0]).lastrowid
+                        else:
+                            conn.execute(statement, params)
+            
+            logger.info("mysql_rows_inserted", table=self.table, rows=len(rows))
+            return ids
         except Exception as e:
-            logger.error("mysql_insert_failed", error=str(e),table=self.table)
+            logger.error("mysql_insert_failed", error=str(e), table=self.table, rows=len(rows))
             raise
     
 
@@ -88,12 +289,12 @@ class MySQLClient:
         """Update an existing row by primary key"""
         try:
             # set clause to check if email=:email , status =:status
-            set_clause = ', '.join([f"{key} = :{key}" for key in data.keys()])
+            set_clause = ', '.join([f"{_quote(key)} = :{key}" for key in data.keys()])
 
-            query = f"UPDATE {self.table} SET {set_clause} WHERE {self.primary_key} = :pk_value"
+            query = f"UPDATE {self._table_sql} SET {set_clause} WHERE {self._pk_sql} = :pk_value"
 
             params = {**data, 'pk_value': pk_value}
-            with self.engine.begin() as conn:
+            with self.transaction() as conn:
                 conn.execute(text(query), params)
         
             logger.info("mysql_row_updated", table=self.table, pk=pk_value, updated_fields=list(data.keys()))
@@ -104,10 +305,8 @@ class MySQLClient:
     def delete_row_by_pk(self,pk_value:Any)->None:
         """Delete a row by primary key."""
         try:
-            query = f"DELETE FROM {self.table} WHERE {self.primary_key} = :pk_value"
-            
-            with self.engine.begin() as conn:
-                result = conn.execute(text(query), {'pk_value': pk_value})
+            with self.transaction() as conn:
+                result = conn.execute(self._delete_sql, {'pk_value': pk_value})
                 rows_deleted = result.rowcount
             
             if rows_deleted == 0:
@@ -118,25 +317,86 @@ class MySQLClient:
             logger.error("mysql_delete_failed", error=str(e), table=self.table, pk=pk_value)
             raise
 
+    def update_rows_by_pk(self, updates: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        """
+        Update many rows by primary key in a single transaction.
+        Updates touching the same columns are folded into one statement:
+        UPDATE t SET col = CASE pk WHEN :pk0 THEN :v0 ... END WHERE pk IN (...)
+        
+        Args:
+            updates: List of (primary key value, {column: new value}) pairs
+        """
+        if not updates:
+            return
+        
+        try:
+            # Group by column set; the key column goes last since MySQL applies SET left to right
+            groups: Dict[tuple, List[Tuple[Any, Dict[str, Any]]]] = {}
+            for pk_value, data in updates:
+                columns = tuple(sorted(data.keys(), key=lambda key: key == self.primary_key))
+                groups.setdefault(columns, []).append((pk_value, data))
+            
+            with self.transaction() as conn:
+                for columns, group in groups.items():
+                    for start in range(0, len(group), UPDATE_BATCH_SIZE):
+                        chunk = group[start:start + UPDATE_BATCH_SIZE]
+                        
+                        # Positional bind names keep odd column names out of the SQL
+                        params = {f"pk_{i}": pk_value for i, (pk_value, _) in enumerate(chunk)}
+                        set_clauses = []
+                        for j, column in enumerate(columns):
+                            cases = []
+                            for i, (_, data) in enumerate(chunk):
+                                params[f"v_{j}_{i}"] = data[column]
+                                cases.append(f"WHEN :pk_{i} THEN :v_{j}_{i}")
+                            set_clauses.append(f"{_quote(column)} = CASE {self._pk_sql} {' '.join(cases)} END")
+                        
+                        pk_list = ', '.join([f":pk_{i}" for i in range(len(chunk))])
+                        query = f"UPDATE {self._table_sql} SET {', '.join(set_clauses)} WHERE {self._pk_sql} IN ({pk_list})"
+                        conn.execute(text(query), params)
+            
+            logger.info("mysql_rows_updated", table=self.table, rows=len(updates))
+        except Exception as e:
+            logger.error("mysql_update_failed", error=str(e), table=self.table, rows=len(updates))
+            raise
+
+    def delete_rows_by_pk(self, pk_values: List[Any]) -> None:
+        """Delete many rows by primary key with DELETE ... WHERE pk IN (...)."""
+        if not pk_values:
+            return
+        
+        try:
+            rows_deleted = 0
+            with self.transaction() as conn:
+                for start in range(0, len(pk_values), DELETE_BATCH_SIZE):
+                    chunk = list(pk_values[start:start + DELETE_BATCH_SIZE])
+                    rows_deleted += conn.execute(self._delete_many_sql, {'pk_values': chunk}).rowcount
+            
+            if rows_deleted < len(pk_values):
+                logger.warning("mysql_delete_missing_rows", table=self.table,
+                               requested=len(pk_values), deleted=rows_deleted)
+            logger.info("mysql_rows_deleted", table=self.table, rows=rows_deleted)
+        except Exception as e:
+            logger.error("mysql_delete_failed", error=str(e), table=self.table, rows=len(pk_values))
+            raise
+
     def get_schema(self) -> Dict[str, str]:
-        """Get column names and their data types."""
+        """Get column names and their data types, re-querying once the cache expires."""
+        if self._schema_cache is not None:
+            schema, fetched_at = self._schema_cache
+            if time.monotonic() - fetched_at < SCHEMA_CACHE_TTL:
+                return schema
 
         try:
             #This is useful for type conversions when syncing with sheets
-            query = """
-                SELECT COLUMN_NAME, DATA_TYPE 
-                FROM INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_SCHEMA = :database 
-                AND TABLE_NAME = :table
-            """
-            
             with self.engine.connect() as conn:
                 result = conn.execute(
-                    text(query), 
+                    self._schema_sql, 
                     {'database': self.database, 'table': self.table}
                 )
                 schema = {row[0]: row[1] for row in result}
             
+            self._schema_cache = (schema, time.monotonic())
             logger.info("mysql_schema_fetched", table=self.table, columns=len(schema))
             return schema
         except Exception as e:
@@ -149,10 +409,13 @@ class MySQLClient:
         Overwrite all data in the table with DataFrame contents.
         Clears table first, then bulk inserts all rows.
         """
+        # to_sql may create the table, so don't trust a schema cached before the write
+        self._schema_cache = None
+        
         try:
-            with self.engine.begin() as conn:
+            with self.transaction() as conn:
                 # Clear existing data
-                conn.execute(text(f"DELETE FROM {self.table}"))
+                conn.execute(self._clear_sql)
                 logger.info("mysql_table_cleared", table=self.table)
                 
                 # Bulk insert using pandas to_sql
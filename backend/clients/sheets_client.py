@@ -1,15 +1,22 @@
+import asyncio
 import os
 import pickle
-from typing import Any, Dict, List, Optional
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import orjson
 import pandas as pd
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 from dotenv import load_dotenv
 
 from backend.utils import logger
+from backend.utils.types import Operation
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +24,39 @@ load_dotenv()
 # Google Sheets API scope 
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# Seconds before the cached header row is fetched again
+HEADERS_CACHE_TTL = 60
+
+
+def _column_letter(index: int) -> str:
+    """Convert a 0-based column index to A1 notation (0 -> A, 26 -> AA)."""
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _row_from_range(a1_range: str) -> Optional[int]:
+    """Extract the last row number from an A1 range like 'Sheet1!A7:E7'."""
+    match = re.search(r'(\d+)$', a1_range or '')
+    return int(match.group(1)) if match else None
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that decodes API responses with orjson."""
+
+    def deserialize(self, content):
+        # Same contract as JsonModel: non-JSON bodies come back as-is
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return content.decode('utf-8') if isinstance(content, bytes) else content
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
 class SheetsClient:
     """Handles all Google Sheets operations."""
     
@@ -35,6 +75,16 @@ class SheetsClient:
         self.credentials_path = credentials_path
         self.token_path = token_path
         
+        # Header row cache: (headers, fetched_at), plus header name -> column index
+        self._headers_cache: Optional[tuple] = None
+        self._header_positions: Dict[str, int] = {}
+        
+        # Primary key -> sheet row number, rebuilt lazily and kept in step with mutations
+        self._pk_index: Optional[Dict[str, int]] = None
+        
+        # Data rows below the header as last seen; None when unknown
+        self._row_count: Optional[int] = None
+        
         # Authenticate and build service
         self.service = self._authenticate()
         
@@ -68,7 +118,8 @@ class SheetsClient:
                 pickle.dump(creds, token)
         
         # Build Sheets API service
-        service = build('sheets', 'v4', credentials=creds)
+        # Responses are decoded with orjson (see _OrjsonModel)
+        service = build('sheets', 'v4', credentials=creds, model=_OrjsonModel())
         logger.info("sheets_authenticated", token_exists=os.path.exists(self.token_path))
         return service
 
@@ -85,6 +136,7 @@ class SheetsClient:
             
             if not values:
                 logger.warning("sheets_empty", sheet_id=self.sheet_id[:20])
+                self._row_count = 0
                 return pd.DataFrame()
             
             # First row is header, rest is data
@@ -92,13 +144,18 @@ class SheetsClient:
             data_rows = values[1:]
 
             # Pad rows to match header length (Sheets API omits trailing empty cells)
-            padded_rows = []
-            for row in data_rows:
-                padded_row = row + [''] * (len(headers) - len(row))  # ← ADD THIS
-                padded_rows.append(padded_row)
+            width = len(headers)
+            padded_rows = [row + [''] * (width - len(row)) for row in data_rows]
             
-            # Convert to DataFrame
-            df = pd.DataFrame(padded_rows, columns=headers)
+            # Every cell arrives as a string, so all columns are object dtype
+            df = pd.DataFrame(padded_rows, columns=headers, dtype=object)
+            
+            self._row_count = len(data_rows)
+            self._set_headers(headers)
+            
+            # Refresh the row index from data we already downloaded
+            if self.primary_key_column in df.columns:
+                self._pk_index = self._index_pks(df[self.primary_key_column])
             
             logger.info("sheets_data_fetched", rows=len(df), sheet_id=self.sheet_id[:20])
             return df
@@ -106,50 +163,197 @@ class SheetsClient:
         except HttpError as e:
             logger.error("sheets_fetch_failed", error=str(e), sheet_id=self.sheet_id[:20])
             raise
+
+    async def async_get_all_data(self) -> pd.DataFrame:
+        """Fetch all data from an async context; the blocking call runs in a worker thread."""
+        return await asyncio.to_thread(self.get_all_data)
+    
+    def _set_headers(self, headers: List[str]) -> None:
+        """Cache the header row and its column positions."""
+        self._headers_cache = (headers, time.monotonic())
+        self._header_positions = {}
+        for col_index, name in enumerate(headers):
+            self._header_positions.setdefault(name, col_index)
+    
+    def _get_headers(self) -> List[str]:
+        """Return the header row, re-fetching it once the cache expires."""
+        if self._headers_cache is not None:
+            headers, fetched_at = self._headers_cache
+            if time.monotonic() - fetched_at < HEADERS_CACHE_TTL:
+                return headers
+        
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.sheet_id,
+            range='A1:Z1'
+        ).execute()
+        headers = result.get('values', [[]])[0]
+        self._set_headers(headers)
+        return headers
+    
+    def _get_header_positions(self) -> Dict[str, int]:
+        """Return header name -> 0-based column index for the cached header row."""
+        self._get_headers()
+        return self._header_positions
+    
+    @staticmethod
+    def _index_pks(pk_values) -> Dict[str, int]:
+        """Map each primary key to its sheet row number (first occurrence wins)."""
+        index = {}
+        # Data starts at row 2 because row 1 is the header
+        for row_num, pk in enumerate(pk_values, start=2):
+            index.setdefault(str(pk), row_num)
+        return index
+    
+    def _build_pk_index(self) -> Dict[str, int]:
+        """Download only the primary key column and rebuild the row index."""
+        positions = self._get_header_positions()
+        if self.primary_key_column not in positions:
+            raise ValueError(f"Primary key column '{self.primary_key_column}' not found in sheet headers")
+        
+        col_letter = _column_letter(positions[self.primary_key_column])
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.sheet_id,
+            range=f"{col_letter}2:{col_letter}"
+        ).execute()
+        
+        # Empty cells come back as empty lists
+        pk_values = [row[0] if row else '' for row in result.get('values', [])]
+        self._pk_index = self._index_pks(pk_values)
+        return self._pk_index
+    
+    def _lookup_row(self, pk_value: Any) -> Optional[int]:
+        """Return the row number for a primary key, or None if it isn't in the sheet."""
+        key = str(pk_value)
+        
+        # Rebuild once if the index is missing or the row was added elsewhere
+        if self._pk_index is None or key not in self._pk_index:
+            self._build_pk_index()
+        
+        return self._pk_index.get(key)
+    
+    def _lookup_rows(self, pk_values: Iterable[Any]) -> List[Optional[int]]:
+        """Row numbers for many primary keys (None where absent), rebuilding the index at most once."""
+        keys = [str(pk_value) for pk_value in pk_values]
+        
+        if self._pk_index is None or any(key not in self._pk_index for key in keys):
+            self._build_pk_index()
+        
+        return [self._pk_index.get(key) for key in keys]
     
     def _find_row_by_pk(self, pk_value: Any) -> int:
         """Find the row number for a given primary key value."""
         try:
-            df = self.get_all_data()
-            
-            # Find row where primary key matches
-            for idx, row in df.iterrows():
-                if str(row[self.primary_key_column]) == str(pk_value):
-                    # +2 because: DataFrame is 0-indexed, and row 1 is header
-                    return idx + 2
-            
-            raise ValueError(f"No row found with {self.primary_key_column}={pk_value}")
+            row_num = self._lookup_row(pk_value)
+            if row_num is None:
+                raise ValueError(f"No row found with {self.primary_key_column}={pk_value}")
+            return row_num
             
         except Exception as e:
             logger.error("sheets_find_row_failed", pk=pk_value, error=str(e))
             raise
 
+    def _cell_ranges(self, row_num: int, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build one ValueRange per known column in data for the given row."""
+        positions = self._get_header_positions()
+        
+        data_ranges = []
+        for column_name, new_value in data.items():
+            if column_name in positions:
+                col_letter = _column_letter(positions[column_name])
+                data_ranges.append({
+                    'range': f"{col_letter}{row_num}",
+                    'values': [[new_value]]
+                })
+        return data_ranges
+
+    def _rekey_row(self, pk_value: Any, data: Dict[str, Any], row_num: int) -> None:
+        """Keep the index valid if an update edited the primary key itself."""
+        new_pk = data.get(self.primary_key_column)
+        if new_pk is not None and self._pk_index is not None and str(new_pk) != str(pk_value):
+            self._pk_index.pop(str(pk_value), None)
+            self._pk_index.setdefault(str(new_pk), row_num)
+
+    @staticmethod
+    def _row_values(headers: List[str], data: Dict[str, Any]) -> List[str]:
+        """Build row values in sheet column order."""
+        row_values = []
+        for header in headers:
+            value = data.get(header, '')
+            row_values.append(str(value) if value != '' else '')
+        return row_values
+
+    def _record_appended(self, rows: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        """Update row count and index after appending rows to the end of the sheet."""
+        if self._row_count is not None:
+            self._row_count += len(rows)
+        
+        if self._pk_index is None:
+            return
+        
+        # Appended rows are contiguous and end at the last row of updatedRange
+        last_row = _row_from_range(result.get('updates', {}).get('updatedRange'))
+        if last_row is None:
+            self._pk_index = None
+            return
+        
+        first_row = last_row - len(rows) + 1
+        for offset, data in enumerate(rows):
+            self._pk_index.setdefault(str(data.get(self.primary_key_column, '')), first_row + offset)
+
+    @staticmethod
+    def _delete_request(start_row: int, end_row: int) -> Dict[str, Any]:
+        """Build a deleteDimension request covering sheet rows start_row..end_row."""
+        return {
+            'deleteDimension': {
+                'range': {
+                    'sheetId': 0,  # First sheet
+                    'dimension': 'ROWS',
+                    'startIndex': start_row - 1,  # 0-indexed for API
+                    'endIndex': end_row
+                }
+            }
+        }
+
+    @staticmethod
+    def _row_spans(rows: Iterable[int]) -> List[Tuple[int, int]]:
+        """Group row numbers into (start, end) runs of consecutive rows, bottom run first."""
+        spans: List[Tuple[int, int]] = []
+        for row in sorted(set(rows), reverse=True):
+            if spans and spans[-1][0] == row + 1:
+                spans[-1] = (row, spans[-1][1])
+            else:
+                spans.append((row, row))
+        return spans
+
+    def _record_deleted(self, deleted: Dict[str, int]) -> None:
+        """Update row count and index after deleting rows (pk -> row number)."""
+        removed = sorted(set(deleted.values()))
+        if self._row_count is not None:
+            self._row_count -= len(removed)
+        
+        # Each row moves up by the number of deleted rows above it
+        for key in deleted:
+            self._pk_index.pop(key, None)
+        for key, row in self._pk_index.items():
+            shift = bisect_left(removed, row)
+            if shift:
+                self._pk_index[key] = row - shift
+
     def update_row_by_pk(self, pk_value: Any, data: Dict[str, Any]) -> None:
         """Update an existing row by primary key value."""
         try:
             # Find which row number has this primary key
             row_num = self._find_row_by_pk(pk_value)
             
-            # Get headers to know column positions
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.sheet_id,
-                range='A1:Z1'
-            ).execute()
-            headers = result.get('values', [[]])[0]
-            
-            # Build update for each column that changed
-            for column_name, new_value in data.items():
-                if column_name in headers:
-                    col_index = headers.index(column_name)
-                    col_letter = chr(65 + col_index)  # A=65, B=66, etc.
-                    
-                    # Update single cell
-                    self.service.spreadsheets().values().update(
-                        spreadsheetId=self.sheet_id,
-                        range=f"{col_letter}{row_num}",
-                        valueInputOption='USER_ENTERED',
-                        body={'values': [[new_value]]}
-                    ).execute()
+            # One ValueRange per changed column, sent in a single request
+            data_ranges = self._cell_ranges(row_num, data)
+            if data_ranges:
+                self.service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=self.sheet_id,
+                    body={'valueInputOption': 'USER_ENTERED', 'data': data_ranges}
+                ).execute()
+            
+            self._rekey_row(pk_value, data, row_num)
             
             logger.info("sheets_row_updated", pk=pk_value, row=row_num, 
                         updated_fields=list(data.keys()))
@@ -162,26 +366,19 @@ class SheetsClient:
         """Insert a new row at the end of the sheet."""
         try:
             # Get headers to know column order
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.sheet_id,
-                range='A1:Z1'
-            ).execute()
-            headers = result.get('values', [[]])[0]
-            
-            # Build row values in correct column order
-            row_values = []
-            for header in headers:
-                value = data.get(header, '')
-                row_values.append(str(value) if value != '' else '')
+            headers = self._get_headers()
+            row_values = self._row_values(headers, data)
             
             # Append row to end
-            self.service.spreadsheets().values().append(
+            result = self.service.spreadsheets().values().append(
                 spreadsheetId=self.sheet_id,
                 range='A:Z',
                 valueInputOption='USER_ENTERED',
                 body={'values': [row_values]}
             ).execute()
             
+            self._record_appended([data], result)
+            
             logger.info("sheets_row_inserted", data=data)
             
         except Exception as e:
@@ -197,26 +394,107 @@ class SheetsClient:
             # Delete the row using batchUpdate
             self.service.spreadsheets().batchUpdate(
                 spreadsheetId=self.sheet_id,
-                body={
-                    'requests': [{
-                        'deleteDimension': {
-                            'range': {
-                                'sheetId': 0,  # First sheet
-                                'dimension': 'ROWS',
-                                'startIndex': row_num - 1,  # 0-indexed for API
-                                'endIndex': row_num
-                            }
-                        }
-                    }]
-                }
+                body={'requests': [self._delete_request(row_num, row_num)]}
             ).execute()
             
+            self._record_deleted({str(pk_value): row_num})
+            
             logger.info("sheets_row_deleted", pk=pk_value, row=row_num)
             
         except Exception as e:
             logger.error("sheets_delete_failed", pk=pk_value, error=str(e))
             raise
 
+    def delete_rows_by_pk(self, pk_values: List[Any]) -> None:
+        """
+        Delete many rows with a single spreadsheets.batchUpdate.
+        Adjacent rows are merged into one deleteDimension range, and ranges are sent
+        bottom-up so earlier deletions don't shift later ones. Keys that are no
+        longer in the sheet are skipped with a warning.
+        """
+        if not pk_values:
+            return
+        
+        try:
+            deleted = {}
+            for pk_value, row_num in zip(pk_values, self._lookup_rows(pk_values)):
+                if row_num is None:
+                    logger.warning("sheets_row_missing", pk=pk_value, operation=Operation.DELETE.value)
+                    continue
+                deleted[str(pk_value)] = row_num
+            
+            if not deleted:
+                return
+            
+            requests = [self._delete_request(start, end) for start, end in self._row_spans(deleted.values())]
+            self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.sheet_id,
+                body={'requests': requests}
+            ).execute()
+            
+            self._record_deleted(deleted)
+            
+            logger.info("sheets_rows_deleted", rows=len(deleted), ranges=len(requests))
+            
+        except Exception as e:
+            logger.error("sheets_delete_failed", error=str(e), rows=len(pk_values))
+            raise
+
+    def update_rows_by_pk(self, updates: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        """
+        Update many rows with a single values.batchUpdate.
+        Rows that are no longer in the sheet are skipped with a warning.
+        
+        Args:
+            updates: List of (primary key value, {column: new value}) pairs
+        """
+        if not updates:
+            return
+        
+        try:
+            data_ranges = []
+            row_nums = self._lookup_rows(pk_value for pk_value, _ in updates)
+            for (pk_value, data), row_num in zip(updates, row_nums):
+                if row_num is None:
+                    logger.warning("sheets_row_missing", pk=pk_value, operation=Operation.UPDATE.value)
+                    continue
+                data_ranges.extend(self._cell_ranges(row_num, data))
+                self._rekey_row(pk_value, data, row_num)
+            
+            if data_ranges:
+                self.service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=self.sheet_id,
+                    body={'valueInputOption': 'USER_ENTERED', 'data': data_ranges}
+                ).execute()
+            
+            logger.info("sheets_rows_updated", rows=len(updates), cells=len(data_ranges))
+            
+        except Exception as e:
+            logger.error("sheets_update_failed", error=str(e), rows=len(updates))
+            raise
+
+    def insert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Append many rows to the end of the sheet with a single values.append."""
+        if not rows:
+            return
+        
+        try:
+            headers = self._get_headers()
+            result = self.service.spreadsheets().values().append(
+                spreadsheetId=self.sheet_id,
+                range='A:Z',
+                valueInputOption='USER_ENTERED',
+                body={'values': [self._row_values(headers, data) for data in rows]}
+            ).execute()
+            
+            self._record_appended(rows, result)
+            
+            logger.info("sheets_rows_inserted", rows=len(rows))
+            
+        except Exception as e:
+            logger.error("sheets_insert_failed", error=str(e), rows=len(rows))
+            raise
+
     def clear_all(self) -> None:
         """Clear all data except the header row."""
         try:
@@ -226,6 +504,9 @@ class SheetsClient:
                 range='A2:Z'  
             ).execute()
             
+            self._pk_index = {}
+            self._row_count = 0
+            
             logger.info("sheets_cleared", sheet_id=self.sheet_id[:20])
             
         except Exception as e:
@@ -234,23 +515,43 @@ class SheetsClient:
 
 
     def write_all(self, df: pd.DataFrame) -> None:
-        """Overwrite all data in the sheet with DataFrame contents."""
+        """
+        Overwrite all data in the sheet with DataFrame contents.
+        The header row and every data row go out in one values.update.
+        """
         try:
-            # Clear existing data first
-            self.clear_all()
+            # Convert all values to strings to handle Timestamp objects; nulls become empty cells
+            values = df.astype(object).where(df.notna(), '').astype(str).to_numpy().tolist()
+            headers = [str(column) for column in df.columns]
             
-            # Convert all values to strings to handle Timestamp objects
-            df_copy = df.astype(str)
-            # Convert DataFrame to list of lists
-            values = df_copy.values.tolist()
+            # Overwrite in place so readers never see an empty sheet
+            if headers:
+                self.service.spreadsheets().values().update(
+                    spreadsheetId=self.sheet_id,
+                    range=f'A1:Z{len(values) + 1}',
+                    valueInputOption='USER_ENTERED',
+                    body={'values': [headers] + values}
+                ).execute()
+                self._set_headers(headers)
             
-            # Write all rows at once
-            self.service.spreadsheets().values().update(
-                spreadsheetId=self.sheet_id,
-                range='A2:Z',
-                valueInputOption='USER_ENTERED',
-                body={'values': values}
-            ).execute()
+            # Clear whatever the frame didn't cover: columns right of it, and rows below it
+            # if the sheet might have been longer
+            leftover = []
+            if headers and len(headers) < 26:
+                leftover.append(f'{_column_letter(len(headers))}1:Z')
+            if self._row_count is None or self._row_count > len(values):
+                leftover.append(f'A{len(values) + 2}:Z')
+            if leftover:
+                self.service.spreadsheets().values().batchClear(
+                    spreadsheetId=self.sheet_id,
+                    body={'ranges': leftover}
+                ).execute()
+            self._row_count = len(values)
+            
+            if self.primary_key_column in df.columns:
+                self._pk_index = self._index_pks(df[self.primary_key_column])
+            else:
+                self._pk_index = None
             
             logger.info("sheets_written", rows=len(df), sheet_id=self.sheet_id[:20])
             
@@ -1,4 +1,5 @@
-from typing import List
+from typing import List, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
@@ -6,20 +7,60 @@ from backend.utils import logger
 from backend.utils.types import Change, Operation, Source
 
 
+# Hash of an empty cell; stands in for columns a snapshot doesn't have
+EMPTY_CELL_HASH = pd.util.hash_array(np.array([''], dtype=object))[0]
+
+
 class ChangeDetector:
     """Detects changes between two DataFrames."""
     
-    def __init__(self, primary_key_column: str = "id"):
-        """Initialize with primary key column name."""
+    def __init__(self, primary_key_column: str = "id", timestamp_column: Optional[str] = None):
+        """
+        Initialize with primary key column name.
+        If timestamp_column is given, UPDATE changes always carry the row's value
+        for it, changed or not, so conflicts can be resolved by timestamp.
+        """
         self.pk_col = primary_key_column
+        self.ts_col = timestamp_column
     
-    def detect_changes(self,old_df: pd.DataFrame, new_df: pd.DataFrame,source: Source)-> List[Change]:
+    def snapshot(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduce a DataFrame to the state needed for change detection.
+        
+        Returns:
+            One uint64 hash per cell, indexed by string primary key; enough to
+            tell which cells changed.
+        """
+        self._validate(df, label="snapshot")
+        return self._hash_cells(self._index_by_pk(df, label="snapshot"))
+
+    @staticmethod
+    def rewind(snapshot: pd.DataFrame, previous: pd.DataFrame, pks: List[str]) -> pd.DataFrame:
+        """
+        Put the rows for pks back as they were in a previous snapshot (dropping
+        those it didn't have), so the next detect_changes reports them again.
+        """
+        pks = pd.Index(pks, dtype=object).unique()
+        kept = snapshot.drop(index=snapshot.index.intersection(pks))
+        restored = previous.loc[previous.index.intersection(pks)].reindex(columns=snapshot.columns, fill_value=EMPTY_CELL_HASH)
+        return pd.concat([kept, restored])
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> int:
+        """
+        Cheap digest of a whole DataFrame (column names plus every row's content).
+        Equal fingerprints mean there is nothing to detect.
+        """
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        return hash((tuple(df.columns), int(row_hashes.sum())))
+
+    def detect_changes(self,old_snapshot: pd.DataFrame, new_df: pd.DataFrame,source: Source)-> List[Change]:
         """
-        Detect changes between old and new DataFrames.
+        Detect changes between a previous snapshot and new data.
         
         Args:
-            old_df: Previous snapshot
-            new_df: Current snapshot
+            old_snapshot: Previous state, as returned by snapshot()
+            new_df: Current data
             source: Where these changes came from (SHEETS or MYSQL)
         
         Returns:
@@ -28,42 +69,18 @@ class ChangeDetector:
         changes = []
         
         # Handle empty DataFrames
-        if old_df.empty and new_df.empty:
+        if old_snapshot.empty and new_df.empty:
             return changes
         
         # Step 5: Validate primary key column exists
-        if not old_df.empty and self.pk_col not in old_df.columns:
-            raise ValueError(
-                f"Primary key column '{self.pk_col}' not found in old DataFrame. "
-                f"Available columns: {list(old_df.columns)}"
-            )
-        if not new_df.empty and self.pk_col not in new_df.columns:
-            raise ValueError(
-                f"Primary key column '{self.pk_col}' not found in new DataFrame. "
-                f"Available columns: {list(new_df.columns)}"
-            )
+        self._validate(new_df, label="new")
         
-        #Detect duplicate primary keys
-        if not old_df.empty:
-            old_duplicates = old_df[old_df[self.pk_col].duplicated()][self.pk_col].tolist()
-            if old_duplicates:
-                logger.warning("duplicate_pks_detected", 
-                            source="old_snapshot", 
-                            duplicates=old_duplicates)
-        
-        if not new_df.empty:
-            new_duplicates = new_df[new_df[self.pk_col].duplicated()][self.pk_col].tolist()
-            if new_duplicates:
-                logger.warning("duplicate_pks_detected", 
-                            source="new_data", 
-                            duplicates=new_duplicates)
-        
-        # Extract primary keys as sets
-        old_pks = set(old_df[self.pk_col].astype(str)) if not old_df.empty else set()
-        new_pks = set(new_df[self.pk_col].astype(str)) if not new_df.empty else set()
+        # Index by string primary key once, so lookups are hash probes.
+        # The same pass reports duplicate primary keys.
+        new_keyed = self._index_by_pk(new_df, label="new_data")
         
         # 1. DELETES: PKs in old but not in new
-        deleted_pks = old_pks - new_pks
+        deleted_pks = old_snapshot.index.difference(new_keyed.index)
         for pk in deleted_pks:
             changes.append(Change(
                 operation=Operation.DELETE,
@@ -73,43 +90,86 @@ class ChangeDetector:
             ))
         
         # 2. INSERTS: PKs in new but not in old
-        inserted_pks = new_pks - old_pks
-        for pk in inserted_pks:
-            row = new_df[new_df[self.pk_col].astype(str) == pk].iloc[0]
+        inserted_pks = new_keyed.index.difference(old_snapshot.index)
+        inserted_rows = new_keyed.loc[inserted_pks].to_dict('index')
+        for pk, row in inserted_rows.items():
             changes.append(Change(
                 operation=Operation.INSERT,
                 primary_key_value=pk,
                 source=source,
-                data=row.to_dict()  # Full row data
+                data=row  # Full row data
             ))
         
-        # 3. UPDATES: PKs in both - compare row by row
-        common_pks = old_pks & new_pks
-        for pk in common_pks:
-            old_row = old_df[old_df[self.pk_col].astype(str) == pk].iloc[0]
-            new_row = new_df[new_df[self.pk_col].astype(str) == pk].iloc[0]
+        # 3. UPDATES: PKs in both - compare all common rows in one pass
+        common_pks = old_snapshot.index.intersection(new_keyed.index)
+        updates = 0
+        if len(common_pks):
+            columns = new_keyed.columns
+            old_common = old_snapshot.loc[common_pks].reindex(columns=columns, fill_value=EMPTY_CELL_HASH).to_numpy()
+            new_common = self._hash_cells(new_keyed.loc[common_pks, columns]).to_numpy()
             
-            # Find changed columns
-            changed_data = {}
-            for col in new_df.columns:
-                old_val = str(old_row[col]) if pd.notna(old_row[col]) else ''
-                new_val = str(new_row[col]) if pd.notna(new_row[col]) else ''
-                
-                if old_val != new_val:
-                    changed_data[col] = new_row[col]
+            # One elementwise comparison over the whole block; dicts are only built for changed cells
+            diff = old_common != new_common
+            changed_rows = diff.any(axis=1).nonzero()[0]
+            changed_pks = common_pks[changed_rows]
             
-            # Only create Change if something actually changed
-            if changed_data:
+            # Box the changed rows into dicts in one call, then keep only their changed cells
+            changed_records = new_keyed.loc[changed_pks, columns].to_dict('index')
+            for i, pk in zip(changed_rows, changed_pks):
+                record = changed_records[pk]
+                changed_data = {column: record[column] for column in columns[diff[i]]}
+                if self.ts_col in record:
+                    changed_data.setdefault(self.ts_col, record[self.ts_col])
                 changes.append(Change(
                     operation=Operation.UPDATE,
                     primary_key_value=pk,
                     source=source,
                     data=changed_data  # Only changed columns
                 ))
+                updates += 1
         
         logger.info("changes_detected", source=source.value, 
                     inserts=len(inserted_pks), 
-                    updates=len([c for c in changes if c.operation == Operation.UPDATE]),
+                    updates=updates,
                     deletes=len(deleted_pks))
         
-        return changes
\ No newline at end of file
+        return changes
+    
+    def _validate(self, df: pd.DataFrame, label: str) -> None:
+        """Reject non-empty frames that lack the primary key column."""
+        if not df.empty and self.pk_col not in df.columns:
+            raise ValueError(
+                f"Primary key column '{self.pk_col}' not found in {label} DataFrame. "
+                f"Available columns: {list(df.columns)}"
+            )
+
+    def _index_by_pk(self, df: pd.DataFrame, label: str) -> pd.DataFrame:
+        """Index rows by the string form of their primary key, keeping the first of any duplicates."""
+        if self.pk_col not in df.columns:
+            # Only empty frames get here; validation rejects the rest
+            return df.set_axis(pd.Index([], dtype=object), axis=0, copy=False)
+        
+        # Cast the key column once; the index, lookups and duplicate check all reuse it
+        pk_str = df[self.pk_col].astype(str).to_numpy()
+        keyed = df.set_axis(pk_str, axis=0, copy=False)
+        
+        duplicated = keyed.index.duplicated(keep='first')
+        if not duplicated.any():
+            return keyed
+        
+        logger.warning("duplicate_pks_detected", 
+                    source=label, 
+                    duplicates=df[self.pk_col][duplicated].tolist())
+        return keyed[~duplicated]
+    
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        """Render cells as strings so both sources compare equal, with nulls as ''."""
+        return df.astype(object).where(df.notna(), '').astype(str)
+
+    @classmethod
+    def _hash_cells(cls, keyed: pd.DataFrame) -> pd.DataFrame:
+        """Hash the normalized string form of every cell, column by column."""
+        normalized = cls._normalize(keyed)
+        hashes = [pd.util.hash_array(normalized.iloc[:, i].to_numpy()) for i in range(normalized.shape[1])]
+        return pd.DataFrame(dict(enumerate(hashes)), index=keyed.index).set_axis(keyed.columns, axis=1)
\ No newline at end of file
@@ -1,9 +1,51 @@
-from typing import List, Tuple
-from datetime import datetime
+import logging
+from typing import Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 
 from backend.utils import logger
 from backend.utils.types import Change
 
+# strptime fallbacks for values fromisoformat rejects (e.g. non-zero-padded fields),
+# indexed as TIMESTAMP_FORMATS[has 'T' separator][has fractional seconds]
+TIMESTAMP_FORMATS = (
+    ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f'),
+    ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f'),
+)
+
+
+# Naive epoch; timestamps are compared as wall-clock values, so no local-time conversion
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Marks a missing or unparseable timestamp in int64 arrays (the same bit pattern NumPy uses for NaT)
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+@lru_cache(maxsize=1 << 15)
+def _parse_ts(value: str) -> Optional[int]:
+    """
+    Parse a timestamp string to integer epoch microseconds, or None if it isn't a supported timestamp.
+    Microseconds are exact for datetime and fit any year in int64 (nanoseconds stop at 2262).
+    Cached because the same values recur every cycle.
+    """
+    # fromisoformat is implemented in C and handles both the space- and T-separated forms
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        # The separator and decimal point select the only format that could match
+        try:
+            parsed = datetime.strptime(value, TIMESTAMP_FORMATS['T' in value]['.' in value])
+        except ValueError:
+            return None
+    
+    # Values with a UTC offset can't be compared with naive ones
+    if parsed.tzinfo is not None:
+        return None
+    return (parsed - _EPOCH) // _MICROSECOND
+
 
 class ConflictResolver:
     """Resolves conflicts using last-write-wins strategy."""
@@ -24,96 +66,102 @@ class ConflictResolver:
         Returns:
             Tuple of (resolved_sheets_changes, resolved_mysql_changes)
         """
-        # Group changes by primary key for easy lookup
-        sheets_by_pk = {c.primary_key_value: c for c in sheets_changes}
-        mysql_by_pk = {c.primary_key_value: c for c in mysql_changes}
+        # Fast path: nothing can conflict when one side has no changes
+        if not sheets_changes or not mysql_changes:
+            logger.info("conflicts_summary", total=0, resolved=0)
+            return list(sheets_changes), list(mysql_changes)
         
-        # Find conflicting primary keys
-        conflicting_pks = set(sheets_by_pk.keys()) & set(mysql_by_pk.keys())
+        # Columnar view: align the Sheets keys against the MySQL keys in one C-level lookup
+        sheets_changes, sheets_pks = self._keyed(sheets_changes)
+        mysql_changes, mysql_pks = self._keyed(mysql_changes)
+        mysql_pos = mysql_pks.get_indexer(sheets_pks)
+        conflict_sheets = np.flatnonzero(mysql_pos >= 0)
         
-        resolved_sheets = []
-        resolved_mysql = []
+        # Usually no keys overlap
+        if not len(conflict_sheets):
+            logger.info("conflicts_summary", total=0, resolved=0)
+            return list(sheets_changes), list(mysql_changes)
         
-        # Process non-conflicting changes
-        for pk, change in sheets_by_pk.items():
-            if pk not in conflicting_pks:
-                resolved_sheets.append(change)
+        conflict_mysql = mysql_pos[conflict_sheets]
         
-        for pk, change in mysql_by_pk.items():
-            if pk not in conflicting_pks:
-                resolved_mysql.append(change)
+        # Raw and parsed timestamps of each conflicting pair, as parallel arrays
+        sheets_raw = [sheets_changes[i].data.get(self.timestamp_col) for i in conflict_sheets]
+        mysql_raw = [mysql_changes[i].data.get(self.timestamp_col) for i in conflict_mysql]
+        missing = np.array([not s or not m for s, m in zip(sheets_raw, mysql_raw)], dtype=bool)
+        sheets_ts = self._parse_column(sheets_raw, missing)
+        mysql_ts = self._parse_column(mysql_raw, missing)
+        invalid = ~missing & ((sheets_ts == NO_TIMESTAMP) | (mysql_ts == NO_TIMESTAMP))
+        valid = ~(missing | invalid)
         
-        #Resolve conflicts
-        conflicts_resolved = 0
+        # Last-write-wins over every conflict at once; MySQL also wins whenever a timestamp is unusable
+        mysql_wins = ~valid | (mysql_ts >= sheets_ts)
+        diff_seconds = np.abs(np.where(valid, mysql_ts - sheets_ts, 0)) / 1e6
         
-        for pk in conflicting_pks:
-            sheets_change = sheets_by_pk[pk]
-            mysql_change = mysql_by_pk[pk]
-            
-            # Extract timestamps from data
-            sheets_timestamp = sheets_change.data.get(self.timestamp_col)
-            mysql_timestamp = mysql_change.data.get(self.timestamp_col)
-            
-            # Handle missing timestamps
-            if not sheets_timestamp or not mysql_timestamp:
-                logger.warning("conflict_missing_timestamp", pk=pk)
-                resolved_mysql.append(mysql_change)
-                continue
+        for i in np.flatnonzero(missing):
+            logger.warning("conflict_missing_timestamp", pk=sheets_changes[conflict_sheets[i]].primary_key_value)
+        for i in np.flatnonzero(invalid):
+            logger.error("conflict_resolution_failed",
+                         pk=sheets_changes[conflict_sheets[i]].primary_key_value,
+                         error="Unable to parse timestamp",
+                         sheets_timestamp=str(sheets_raw[i]),
+                         mysql_timestamp=str(mysql_raw[i]))
+        
+        # Full row payloads are only collected when debug logging is on
+        log_payload = logging.getLogger(__name__).isEnabledFor(logging.DEBUG)
+        
+        # One record per conflict, logged together as a single event below
+        items = []
+        for i in np.flatnonzero(valid):
+            sheets_change = sheets_changes[conflict_sheets[i]]
+            mysql_change = mysql_changes[conflict_mysql[i]]
+            kept, discarded = (mysql_change, sheets_change) if mysql_wins[i] else (sheets_change, mysql_change)
             
-            # Parse and compare timestamps
-            try:
-                sheets_dt = self._parse_timestamp(sheets_timestamp)
-                mysql_dt = self._parse_timestamp(mysql_timestamp)
-                
-                # Keep the newer change (last-write-wins)
-                if mysql_dt >= sheets_dt:
-                    resolved_mysql.append(mysql_change)
-                    logger.warning("conflict_detected_lww", 
-                                  pk=pk, 
-                                  winner="mysql",
-                                  mysql_timestamp=str(mysql_dt),
-                                  sheets_timestamp=str(sheets_dt),
-                                  time_diff_seconds=(mysql_dt - sheets_dt).total_seconds(),
-                                  discarded_source="sheets",
-                                  discarded_data=sheets_change.data,
-                                  kept_data=mysql_change.data)
-                else:
-                    resolved_sheets.append(sheets_change)
-                    logger.warning("conflict_detected_lww",
-                                  pk=pk, 
-                                  winner="sheets",
-                                  sheets_timestamp=str(sheets_dt),
-                                  mysql_timestamp=str(mysql_dt),
-                                  time_diff_seconds=(sheets_dt - mysql_dt).total_seconds(),
-                                  discarded_source="mysql",
-                                  discarded_data=mysql_change.data,
-                                  kept_data=sheets_change.data)
-                
-                conflicts_resolved += 1
-                
-            except Exception as e:
-                logger.error("conflict_resolution_failed", pk=pk, error=str(e))
-                resolved_mysql.append(mysql_change)
-        
-        logger.info("conflicts_summary", total=len(conflicting_pks), resolved=conflicts_resolved)
+            item = {
+                "pk": sheets_change.primary_key_value,
+                "winner": kept.source.value,
+                "mysql_timestamp": str(mysql_raw[i]),
+                "sheets_timestamp": str(sheets_raw[i]),
+                "time_diff_seconds": float(diff_seconds[i]),
+            }
+            if log_payload:
+                item["discarded_data"] = discarded.data
+                item["kept_data"] = kept.data
+            items.append(item)
+        
+        if items:
+            logger.warning("conflicts_batch", strategy="lww", count=len(items), items=items)
+        
+        # Drop each conflict's losing side; everything else passes through in order
+        keep_sheets = np.ones(len(sheets_changes), dtype=bool)
+        keep_sheets[conflict_sheets[mysql_wins]] = False
+        keep_mysql = np.ones(len(mysql_changes), dtype=bool)
+        keep_mysql[conflict_mysql[~mysql_wins]] = False
+        
+        resolved_sheets = [sheets_changes[i] for i in np.flatnonzero(keep_sheets)]
+        resolved_mysql = [mysql_changes[i] for i in np.flatnonzero(keep_mysql)]
+        
+        logger.info("conflicts_summary", total=len(conflict_sheets), resolved=len(items))
         
         return resolved_sheets, resolved_mysql
 
+    @staticmethod
+    def _keyed(changes: List[Change]) -> Tuple[List[Change], pd.Index]:
+        """
+        Primary keys of a change list as an Index, for vectorized alignment.
+        Keys must be unique; if a key repeats, only its last change is kept.
+        """
+        pks = pd.Index([c.primary_key_value for c in changes], dtype=object)
+        if pks.is_unique:
+            return changes, pks
+        
+        last = ~pks.duplicated(keep='last')
+        return [c for c, keep in zip(changes, last) if keep], pks[last]
+
+    def _parse_column(self, raw: List[Any], skip: np.ndarray) -> np.ndarray:
+        """Parse timestamps to an int64 epoch-microseconds array; NO_TIMESTAMP where skipped or unparseable."""
+        parsed = [NO_TIMESTAMP if skip_value else self._parse_timestamp(value) for value, skip_value in zip(raw, skip.tolist())]
+        return np.array([NO_TIMESTAMP if ts is None else ts for ts in parsed], dtype=np.int64)
 
-    def _parse_timestamp(self, timestamp: str) -> datetime:
-        """Parse timestamp string to datetime object."""
-        # Handle common formats
-        formats = [
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d %H:%M:%S.%f',
-            '%Y-%m-%dT%H:%M:%S',
-            '%Y-%m-%dT%H:%M:%S.%f'
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(str(timestamp), fmt)
-            except ValueError:
-                continue
-        
-        raise ValueError(f"Unable to parse timestamp: {timestamp}")
\ No newline at end of file
+    def _parse_timestamp(self, timestamp: str) -> Optional[int]:
+        """Parse timestamp to epoch microseconds; None if it can't be parsed."""
+        return _parse_ts(str(timestamp))
@@ -1,8 +1,13 @@
-import time
-from typing import Optional
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 import pandas as pd
+from googleapiclient.errors import HttpError
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError
 
 from backend.clients.mysql_client import MySQLClient
 from backend.clients.sheets_client import SheetsClient
@@ -12,7 +17,15 @@ from backend.utils import logger
 from backend.utils.types import Change, Operation, Source
 
 
-@dataclass
+# Failures caused by the rows in a batch rather than the connection or the service;
+# only these are worth splitting a batch to isolate the bad rows
+ROW_ERRORS = (IntegrityError, DataError)
+
+# MySQL's "Unknown column" error, raised as an OperationalError
+UNKNOWN_COLUMN_ERRNO = 1054
+
+
+@dataclass(slots=True)
 class SyncStatus:
     """Tracks sync engine state."""
     is_running: bool = False
@@ -20,6 +33,8 @@ class SyncStatus:
     sync_count: int = 0
     last_error: Optional[str] = None
     conflicts_resolved: int = 0
+    mysql_rows: int = 0        # Row counts as of the latest snapshots
+    sheets_rows: int = 0
 
 
 class SyncEngine:
@@ -47,16 +62,43 @@ class SyncEngine:
         self.initial_sync_source = initial_sync_source
         
         # Initialize components
-        self.change_detector = ChangeDetector(primary_key_column="id")
+        self.change_detector = ChangeDetector(primary_key_column="id", timestamp_column="last_modified")
         self.conflict_resolver = ConflictResolver(timestamp_column="last_modified")
         
+        # Per-operation payload builders used by _apply_changes
+        self._payload_builders = {
+            Operation.INSERT: self._insert_payload,
+            Operation.UPDATE: self._update_payload,
+            Operation.DELETE: self._delete_payload,
+        }
+        
+        # Runs the two concurrent fetches; exists only while the engine is running,
+        # and is released by stop() or, if a cycle is in flight, at the end of that cycle
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._in_cycle = False
+        
         # Track state
         self.status = SyncStatus()
         
-        # Snapshots for change detection
+        # Snapshots for change detection (per-cell hashes, see ChangeDetector.snapshot)
         self.mysql_snapshot: Optional[pd.DataFrame] = None
         self.sheets_snapshot: Optional[pd.DataFrame] = None
         
+        # Fingerprints of the data each snapshot was taken from
+        self.mysql_fp: Optional[int] = None
+        self.sheets_fp: Optional[int] = None
+        
+        # Changes a cycle couldn't apply; their rows are rewound in the new snapshots
+        self._deferred: List[Change] = []
+        
+        # Last MySQL data and its per-row hashes, so later fetches only pull changed rows
+        self._mysql_data: Optional[pd.DataFrame] = None
+        self._mysql_hashes: Optional[pd.Series] = None
+        
+        # Set by notify_change() to start the next cycle early; bound to the loop in run_async
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        
         logger.info("sync_engine_initialized", 
                    sync_interval=sync_interval,
                    initial_sync_source=initial_sync_source)
@@ -78,8 +120,7 @@ class SyncEngine:
                 self.sheets_client.write_all(mysql_df)
                 
                 # Initialize snapshots
-                self.mysql_snapshot = mysql_df.copy()
-                self.sheets_snapshot = mysql_df.copy()
+                self._take_snapshots(mysql_df, mysql_df)
                 
                 logger.info("initial_sync_complete", source="mysql", rows=len(mysql_df))
                 
@@ -93,8 +134,7 @@ class SyncEngine:
                 self.mysql_client.write_all(sheets_df)
                 
                 # Initialize snapshots
-                self.mysql_snapshot = sheets_df.copy()
-                self.sheets_snapshot = sheets_df.copy()
+                self._take_snapshots(sheets_df, sheets_df)
                 
                 logger.info("initial_sync_complete", source="sheets", rows=len(sheets_df))
                 
@@ -105,9 +145,167 @@ class SyncEngine:
             logger.error("initial_sync_failed", error=str(e))
             raise
     
+    def _fetch_all(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Fetch MySQL and Sheets data concurrently.
+        Both calls are network-bound and independent, so the wait is the slower
+        of the two rather than their sum.
+        
+        Returns:
+            Tuple of (mysql_df, sheets_df)
+        """
+        if self._pool is None:
+            # Once stop() is requested, finish the cycle without a new pool
+            if not self.status.is_running:
+                return self._fetch_mysql(), self.sheets_client.get_all_data()
+            self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sync-fetch")
+        
+        mysql_future = self._pool.submit(self._fetch_mysql)
+        sheets_future = self._pool.submit(self.sheets_client.get_all_data)
+        return mysql_future.result(), sheets_future.result()
+    
+    def _fetch_mysql(self) -> pd.DataFrame:
+        """
+        Current MySQL data, transferring only rows whose hash changed since the last fetch.
+        Row hashes are compared first; unchanged rows are reused from the previous
+        result, so steady-state traffic scales with the number of changes, not the table.
+        """
+        hashes = self.mysql_client.get_row_hashes()
+        previous, previous_hashes = self._mysql_data, self._mysql_hashes
+        
+        if previous is None or previous_hashes is None:
+            data = self.mysql_client.get_all_data()
+        else:
+            # Digests are compared as uint64 on shared keys only; new keys are changed by definition
+            common = hashes.index.intersection(previous_hashes.index)
+            differs = hashes[common].to_numpy() != previous_hashes[common].to_numpy()
+            changed = hashes.index.difference(previous_hashes.index).append(common[differs])
+            gone = previous_hashes.index.difference(hashes.index)
+            
+            if not len(changed) and not len(gone):
+                data = previous
+            else:
+                pk_column = self.mysql_client.primary_key
+                stale = pd.Index(changed).append(gone)
+                kept = previous[~previous[pk_column].astype(str).isin(stale)]
+                fetched = self.mysql_client.get_rows_by_pk(changed.tolist()) if len(changed) else kept.iloc[:0]
+                data = pd.concat([kept, fetched], ignore_index=True)
+                logger.info("mysql_delta_fetched", changed=len(changed), deleted=len(gone), rows=len(data))
+        
+        self._mysql_data, self._mysql_hashes = data, hashes
+        return data
+
+    def _take_snapshots(self, mysql_df: pd.DataFrame, sheets_df: pd.DataFrame) -> None:
+        """Keep hashed snapshots of both systems for the next cycle."""
+        self.mysql_snapshot = self.change_detector.snapshot(mysql_df)
+        self.sheets_snapshot = (self.mysql_snapshot if sheets_df is mysql_df
+                                else self.change_detector.snapshot(sheets_df))
+        self.mysql_fp = self.change_detector.fingerprint(mysql_df)
+        self.sheets_fp = self.change_detector.fingerprint(sheets_df)
+        self.status.mysql_rows = len(mysql_df)
+        self.status.sheets_rows = len(sheets_df)
+
+    def _rewind_snapshots(self, previous_mysql: pd.DataFrame, previous_sheets: pd.DataFrame) -> None:
+        """Rewind the rows of deferred changes in the new snapshots so the next cycle detects them again."""
+        mysql_pks = [c.primary_key_value for c in self._deferred if c.source == Source.MYSQL]
+        sheets_pks = [c.primary_key_value for c in self._deferred if c.source == Source.SHEETS]
+        
+        # Rewound snapshots no longer match the fetched data, so the fingerprints can't skip the next cycle
+        if mysql_pks:
+            self.mysql_snapshot = self.change_detector.rewind(self.mysql_snapshot, previous_mysql, mysql_pks)
+            self.mysql_fp = None
+        if sheets_pks:
+            self.sheets_snapshot = self.change_detector.rewind(self.sheets_snapshot, previous_sheets, sheets_pks)
+            self.sheets_fp = None
+        
+        logger.warning("changes_deferred", mysql=len(mysql_pks), sheets=len(sheets_pks))
+
+    def _unchanged(self, current_mysql: pd.DataFrame, current_sheets: pd.DataFrame) -> bool:
+        """True if both systems still hold exactly the data their snapshots were taken from."""
+        return (self.change_detector.fingerprint(current_mysql) == self.mysql_fp
+                and self.change_detector.fingerprint(current_sheets) == self.sheets_fp)
+
+    @staticmethod
+    def _insert_payload(change: Change, target: str, now_str: str) -> Optional[Dict[str, Any]]:
+        """Row to insert, or None if the row isn't ready for the target yet."""
+        # Skip incomplete rows (user still typing in Sheets)
+        if target == "mysql":
+            required = ['id', 'name', 'email']
+            if not all(change.data.get(f) for f in required):
+                logger.warning("skipping_incomplete_row", 
+                            pk=change.primary_key_value,
+                            data=change.data)
+                return None
+            # Default status if empty
+            if not change.data.get('status'):
+                change.data['status'] = 'active'
+        
+        return change.data
+
+    @staticmethod
+    def _update_payload(change: Change, target: str, now_str: str) -> Tuple[Any, Dict[str, Any]]:
+        """(primary key, changed columns) pair, stamping last_modified for Sheets."""
+        update_data = change.data.copy()
+        if target == "sheets" and "last_modified" not in update_data:
+            update_data["last_modified"] = now_str
+        
+        return change.primary_key_value, update_data
+
+    @staticmethod
+    def _delete_payload(change: Change, target: str, now_str: str) -> Any:
+        """Primary key of the row to delete."""
+        return change.primary_key_value
+
+    def _apply_batch(
+        self,
+        applier: Callable[[List[Any]], Any],
+        operation: Operation,
+        batch: List[Tuple[Change, Any]],
+        target: str
+    ) -> int:
+        """
+        Send (change, payload) pairs through a bulk applier and return how many landed.
+        A call that fails on row data is split in half and retried until the failing
+        rows are isolated, so a bad row only loses itself. Any other error (quota,
+        server, connection, TransactionAborted) propagates, failing the batch at once.
+        """
+        try:
+            applier([payload for _, payload in batch])
+            return len(batch)
+        except Exception as e:
+            if not self._is_row_error(e):
+                raise
+            if len(batch) == 1:
+                logger.error("change_apply_failed",
+                            operation=operation.value,
+                            pk=batch[0][0].primary_key_value,
+                            target=target,
+                            error=str(e))
+                return 0
+            logger.warning("change_batch_split",
+                           operation=operation.value,
+                           count=len(batch),
+                           target=target,
+                           error=str(e))
+        
+        middle = len(batch) // 2
+        return (self._apply_batch(applier, operation, batch[:middle], target)
+                + self._apply_batch(applier, operation, batch[middle:], target))
+
+    @staticmethod
+    def _is_row_error(error: Exception) -> bool:
+        """True if the error comes from the rows sent, so retrying other rows can succeed."""
+        if isinstance(error, HttpError):
+            return error.resp.status == 400
+        if isinstance(error, DBAPIError) and getattr(error.orig, 'args', (None,))[:1] == (UNKNOWN_COLUMN_ERRNO,):
+            return True
+        return isinstance(error, ROW_ERRORS)
+
     def _apply_changes(self, changes: list[Change], target: str) -> int:
         """
         Apply changes to target system.
+        Changes are grouped by operation and each group goes out through the
+        client's bulk method.
         
         Args:
             changes: List of changes to apply
@@ -119,49 +317,108 @@ class SyncEngine:
         client = self.mysql_client if target == "mysql" else self.sheets_client
         success_count=0
         
+        # One timestamp shared by every update in the batch
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Updates first while Sheets row numbers are still valid, then deletes, then inserts
+        batches = {Operation.UPDATE: [], Operation.DELETE: [], Operation.INSERT: []}
+        appliers = {
+            Operation.UPDATE: client.update_rows_by_pk,
+            Operation.DELETE: client.delete_rows_by_pk,
+            Operation.INSERT: client.insert_rows,
+        }
+        
+        # Build each change's payload with its operation's builder
         for change in changes:
-            try:
-                if change.operation == Operation.INSERT:
-                    # Skip incomplete rows (user still typing in Sheets)
-                    if target == "mysql":
-                        required = ['id', 'name', 'email']
-                        if not all(change.data.get(f) for f in required):
-                            logger.warning("skipping_incomplete_row", 
-                                        pk=change.primary_key_value,
-                                        data=change.data)
-                            continue
-                        # Default status if empty
-                        if not change.data.get('status'):
-                            change.data['status'] = 'active'
-                    
-                    client.insert_row(change.data)
-                    
-                elif change.operation == Operation.UPDATE:
-                    update_data = change.data.copy()
-                    if target == "sheets" and "last_modified" not in update_data:
-                        update_data["last_modified"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                    client.update_row_by_pk(change.primary_key_value, update_data)
-                    
-                elif change.operation == Operation.DELETE:
-                    client.delete_row_by_pk(change.primary_key_value)
-                
-                logger.info("change_applied", 
-                        operation=change.operation.value,
-                        pk=change.primary_key_value,
-                        target=target)
-                success_count+=1
-                        
-            except Exception as e:
-                logger.error("change_apply_failed",
-                            operation=change.operation.value,
-                            pk=change.primary_key_value,
-                            target=target,
-                            error=str(e))
-                continue
+            payload = self._payload_builders[change.operation](change, target, now_str)
+            if payload is not None:
+                batches[change.operation].append((change, payload))
+        
+        # MySQL commits all of a cycle's writes together
+        transaction = client.transaction() if target == "mysql" else nullcontext()
+        
+        applied = Counter()
+        remaining = [operation for operation, batch in batches.items() if batch]
+        try:
+            with transaction:
+                while remaining:
+                    operation = remaining[0]
+                    count = self._apply_batch(appliers[operation], operation, batches[operation], target)
+                    if count:
+                        applied[f"{operation.value.lower()}s"] += count
+                    success_count+=count
+                    remaining.pop(0)
+        except Exception as e:
+            # The failed operation and those after it are retried next cycle. A MySQL
+            # rollback also undid the operations before it, so those are retried too.
+            if target == "mysql":
+                remaining = [operation for operation, batch in batches.items() if batch]
+                applied.clear()
+                success_count = 0
+            deferred = [change for operation in remaining for change, _ in batches[operation]]
+            self._deferred.extend(deferred)
+            logger.warning("changes_apply_deferred", target=target, count=len(deferred), error=str(e))
+        
+        # One summary line per target, keyed like changes_detected; failures are logged above
+        if applied:
+            logger.info("changes_applied", target=target, **applied)
         return success_count
     
 
+    def _process_changes(self, current_mysql: pd.DataFrame, current_sheets: pd.DataFrame) -> Tuple[int, int, int]:
+        """
+        Steps 2-4 of a sync cycle: detect, resolve and apply changes.
+        
+        Returns:
+            Tuple of (mysql_changes, sheets_changes, conflicts) counts for the cycle log
+        """
+        # 2. Detect changes
+        mysql_changes = self.change_detector.detect_changes(
+            self.mysql_snapshot,
+            current_mysql,
+            Source.MYSQL
+        )
+        
+        sheets_changes = self.change_detector.detect_changes(
+            self.sheets_snapshot,
+            current_sheets,
+            Source.SHEETS
+        )
+        
+        # 3. Resolve conflicts
+        resolved_sheets, resolved_mysql = self.conflict_resolver.resolve_conflicts(
+            sheets_changes,
+            mysql_changes
+        )
+        
+        conflicts_count = len(sheets_changes) + len(mysql_changes) - len(resolved_sheets) - len(resolved_mysql)
+        self.status.conflicts_resolved += conflicts_count
+        
+        # 4. Apply changes
+        self._apply_changes(resolved_sheets, target="mysql")
+        self._apply_changes(resolved_mysql, target="sheets")
+        
+        return len(resolved_mysql), len(resolved_sheets), conflicts_count
+
+    def _complete_cycle(self, counts: Tuple[int, int, int]) -> None:
+        """Update status and log the end of a successful cycle."""
+        mysql_count, sheets_count, conflicts_count = counts
+        
+        self.status.last_sync_time = datetime.now()
+        self.status.sync_count += 1
+        
+        logger.info("sync_cycle_complete",
+                sync_count=self.status.sync_count,
+                mysql_changes=mysql_count,
+                sheets_changes=sheets_count,
+                conflicts=conflicts_count)
+
+    def _fail_cycle(self, error: Exception) -> None:
+        """Record a failed cycle and stop the loop."""
+        logger.error("sync_cycle_failed", error=str(error))
+        self.status.is_running = False
+        self.status.last_error = str(error)
+
     def _sync_cycle(self) -> None:
         """
         Perform one sync cycle:
@@ -171,74 +428,64 @@ class SyncEngine:
         4. Apply changes to target systems
         5. Update snapshots
         """
+        self._in_cycle = True
         try:
             # 1. Fetch current data
-            current_mysql = self.mysql_client.get_all_data()
-            current_sheets = self.sheets_client.get_all_data()
-            
-            # 2. Detect changes
-            mysql_changes = self.change_detector.detect_changes(
-                self.mysql_snapshot,
-                current_mysql,
-                Source.MYSQL
-            )
-            
-            sheets_changes = self.change_detector.detect_changes(
-                self.sheets_snapshot,
-                current_sheets,
-                Source.SHEETS
-            )
-            
-            # Add timestamps to changes
-            for change in mysql_changes:
-                if change.operation in (Operation.INSERT, Operation.UPDATE):
-                    # Extract timestamp from current data
-                    row = current_mysql[current_mysql['id'].astype(str) == str(change.primary_key_value)]
-                    if not row.empty and 'last_modified' in row.columns:
-                        change.data['last_modified'] = row.iloc[0]['last_modified']
+            current_mysql, current_sheets = self._fetch_all()
             
-            for change in sheets_changes:
-                if change.operation in (Operation.INSERT, Operation.UPDATE):
-                    # Extract timestamp from current data
-                    row = current_sheets[current_sheets['id'].astype(str) == str(change.primary_key_value)]
-                    if not row.empty and 'last_modified' in row.columns:
-                        change.data['last_modified'] = row.iloc[0]['last_modified']
+            # Nothing changed on either side: skip detection and the snapshot re-fetch
+            if self._unchanged(current_mysql, current_sheets):
+                self._complete_cycle((0, 0, 0))
+                return
             
-            # 3. Resolve conflicts
-            resolved_sheets, resolved_mysql = self.conflict_resolver.resolve_conflicts(
-                sheets_changes,
-                mysql_changes
-            )
-            
-            conflicts_count = len(sheets_changes) + len(mysql_changes) - len(resolved_sheets) - len(resolved_mysql)
-            self.status.conflicts_resolved += conflicts_count
-            
-            # 4. Apply changes
-            self._apply_changes(resolved_sheets, target="mysql")
-            self._apply_changes(resolved_mysql, target="sheets")
+            self._deferred = []
+            previous = (self.mysql_snapshot, self.sheets_snapshot)
+            counts = self._process_changes(current_mysql, current_sheets)
             
             # 5. Update snapshots (re-fetch to get current state including our changes)
-            self.mysql_snapshot = self.mysql_client.get_all_data()
-            self.sheets_snapshot = self.sheets_client.get_all_data()
-            
-            # Update status
-            self.status.last_sync_time = datetime.now()
-            self.status.sync_count += 1
+            self._take_snapshots(*self._fetch_all())
+            if self._deferred:
+                self._rewind_snapshots(*previous)
             
-            logger.info("sync_cycle_complete",
-                    sync_count=self.status.sync_count,
-                    mysql_changes=len(resolved_mysql),
-                    sheets_changes=len(resolved_sheets),
-                    conflicts=conflicts_count)
+            self._complete_cycle(counts)
             
         except Exception as e:
-            logger.error("sync_cycle_failed", error=str(e))
-            self.status.is_running = False
-            self.status.last_error = str(e)
+            self._fail_cycle(e)
             raise
+        finally:
+            self._in_cycle = False
+            if not self.status.is_running:
+                self._release_pool()
 
-    def start(self) -> None:
-        """Start the sync engine."""
+    async def _sync_cycle_async(self) -> None:
+        """Run _sync_cycle in a worker thread so the event loop stays free while it blocks."""
+        await asyncio.to_thread(self._sync_cycle)
+
+    def notify_change(self) -> None:
+        """
+        Start the next sync cycle now.
+        Safe to call from any thread, e.g. a MySQL binlog reader or a handler for
+        Drive push notifications. Does nothing while the engine isn't running.
+        """
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _wait_for_change(self) -> None:
+        """Wait up to sync_interval seconds, returning early if notify_change() is called."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.sync_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def run_async(self) -> None:
+        """
+        Run the sync engine as a coroutine.
+        Cycles run in a worker thread, so the engine can share the event loop with
+        other tasks (e.g. an API server). Between cycles it waits for notify_change()
+        or, at most, sync_interval seconds.
+        """
         if self.status.is_running:
             logger.warning("sync_already_running")
             return
@@ -246,23 +493,37 @@ class SyncEngine:
         logger.info("sync_engine_starting")
         
         # Perform initial sync
-        self._initial_sync()
+        await asyncio.to_thread(self._initial_sync)
         
         # Start continuous sync loop
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
         self.status.is_running = True
         
         try:
             while self.status.is_running:
-                self._sync_cycle()
-                time.sleep(self.sync_interval)
+                await self._sync_cycle_async()
+                await self._wait_for_change()
                 
-        except KeyboardInterrupt:
-            logger.info("sync_engine_interrupted")
+        except asyncio.CancelledError:
             self.stop()
+            raise
         except Exception as e:
             logger.error("sync_engine_error", error=str(e))
             self.stop()
             raise
+        finally:
+            self._loop = self._wakeup = None
+            # A cancelled cycle may still be running in its thread; it releases the pool when done
+            if not self._in_cycle:
+                self._release_pool()
+
+    def start(self) -> None:
+        """Start the sync engine (blocks until stopped)."""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("sync_engine_interrupted")
 
 
     def stop(self) -> None:
@@ -270,4 +531,18 @@ class SyncEngine:
         logger.info("sync_engine_stopping",
                 total_syncs=self.status.sync_count,
                 conflicts_resolved=self.status.conflicts_resolved)
-        self.status.is_running = False
\ No newline at end of file
+        self.status.is_running = False
+        
+        # Don't leave the loop waiting out the rest of the interval
+        self.notify_change()
+        
+        # A cycle in flight releases the pool itself when it finishes
+        if not self._in_cycle:
+            self._release_pool()
+
+    def _release_pool(self) -> None:
+        """Shut down the fetch pool's threads; the next _fetch_all creates a new one."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
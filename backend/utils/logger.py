@@ -1,5 +1,7 @@
+import orjson
 import structlog
 import logging
+from logging.handlers import MemoryHandler, RotatingFileHandler
 import sys
 import os
 from datetime import datetime
@@ -8,6 +10,14 @@ from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent 
 
+def _orjson_dumps(event_dict, **kwargs) -> str:
+    """Serialize a log event with orjson; NumPy scalars are supported and other unknown objects fall back to str()."""
+    return orjson.dumps(
+        event_dict,
+        default=str,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+    ).decode()
+
 def setup_logging(log_level: str = "INFO"):
     
     #Create logs/ folder if it doesn't exist
@@ -20,13 +30,19 @@ def setup_logging(log_level: str = "INFO"):
     log_file = log_dir / f"sync_{today}.log"
     
     
-    file_handler = logging.FileHandler(log_file)
+    # Rotate at 50 MB; the file is only opened once the first record is written
+    file_handler = RotatingFileHandler(log_file, maxBytes=50 << 20, backupCount=10, delay=True)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    # Buffer records in memory and write them in batches; errors flush immediately
+    buffered_handler = MemoryHandler(capacity=1024, flushLevel=logging.ERROR, target=file_handler)
+    level = getattr(logging, log_level.upper())
     
     #configure basic logging
     logging.basicConfig(
         format="%(message)s",
-        handlers=[file_handler],
-        level=getattr(logging, log_level.upper()),
+        handlers=[buffered_handler],
+        level=level,
     )
     
     # structlog processors
@@ -34,9 +50,11 @@ def setup_logging(log_level: str = "INFO"):
         processors=[
             structlog.processors.add_log_level,
             structlog.processors.TimeStamper(fmt="iso"),  
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps),
         ],
         logger_factory=structlog.stdlib.LoggerFactory(),
+        # Calls below the level return immediately, before any processor or JSON rendering
+        wrapper_class=structlog.make_filtering_bound_logger(level),
     )
     
     return structlog.get_logger()
@@ -14,7 +14,7 @@ class Source(str,Enum):
     MYSQL="mysql"
 
 
-@dataclass
+@dataclass(slots=True)
 class Change:
     """Represents a single change detected in either data source."""
     operation: Operation
@@ -35,7 +35,7 @@ class Change:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class SyncStatus:
     """Current status of the sync engine."""
     is_running: bool = False           # Default to not running
@@ -33,8 +33,8 @@ print("   - Edit data in MySQL or Sheets to see sync in action!\n")
 # Instead of engine.start(), let's run the loop manually with prints
 engine._initial_sync()
 print("✅ Initial sync complete!")
-print(f"   MySQL: {len(mysql_client.get_all_data())} rows")
-print(f"   Sheets: {len(sheets_client.get_all_data())} rows")
+print(f"   MySQL: {engine.status.mysql_rows} rows")
+print(f"   Sheets: {engine.status.sheets_rows} rows")
 
 engine.status.is_running = True
 
@@ -44,7 +44,7 @@ try:
         
         engine._sync_cycle()
         
-        print(f"   ✅ Sync complete | MySQL: {len(mysql_client.get_all_data())} | Sheets: {len(sheets_client.get_all_data())}")
+        print(f"   ✅ Sync complete | MySQL: {engine.status.mysql_rows} | Sheets: {engine.status.sheets_rows}")
         
         time.sleep(engine.sync_interval)
         
@@ -59,7 +59,7 @@ except KeyboardInterrupt:
     print(f"   Errors: {engine.status.last_error or 'None'}")
     
     print("\n📊 After sync:")
-    print("MySQL rows:", len(mysql_client.get_all_data()))
-    print("Sheets rows:", len(sheets_client.get_all_data()))
+    print("MySQL rows:", engine.status.mysql_rows)
+    print("Sheets rows:", engine.status.sheets_rows)
     
     print("\n✅ Test complete!")
\ No newline at end of file